@@ -1,9 +1,13 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, stream_with_context
 from google.cloud import dataproc_v1 as dataproc
 from google.cloud import storage
+from google.cloud.exceptions import NotFound
 from google.cloud.dataproc_v1.types import Job, JobPlacement, PySparkJob
-import json
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+import orjson
 import os
+import time
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -18,12 +22,38 @@ REGION = os.getenv("REGION", "us-central1")
 CLUSTER_NAME = os.getenv("CLUSTER_NAME", "cluster-dataproc")
 BUCKET_NAME = os.getenv("BUCKET_NAME", "storage-dataproc-cluster-bucket")
 PORT = int(os.getenv("PORT", 5001))
+GCS_POOL_SIZE = int(os.getenv("GCS_POOL_SIZE", 64))
+
+# Under gunicorn's gevent worker the stdlib is already monkey-patched, so the
+# GCS client's HTTP calls yield on I/O; gRPC (used by the Dataproc client)
+# needs its own hook to cooperate with the gevent loop.
+try:
+    from gevent import monkey
+    if monkey.is_module_patched("socket"):
+        from grpc.experimental import gevent as grpc_gevent
+        grpc_gevent.init_gevent()
+except ImportError:
+    pass
 
 # Initialize clients
 job_client = dataproc.JobControllerClient(
     client_options={"api_endpoint": f"{REGION}-dataproc.googleapis.com:443"}
 )
 storage_client = storage.Client(project=PROJECT_ID)
+# Widen the default 10-connection pool; connections are kept alive and reused
+storage_client._http.mount(
+    "https://",
+    HTTPAdapter(pool_connections=GCS_POOL_SIZE, pool_maxsize=GCS_POOL_SIZE)
+)
+DEFAULT_BUCKET = storage_client.bucket(BUCKET_NAME)
+# Shared by all /results requests in the process; sized like the GCS
+# connection pool so concurrent requests don't queue behind each other
+results_executor = ThreadPoolExecutor(max_workers=GCS_POOL_SIZE)
+
+
+def orjsonify(payload):
+    """Serialize payload with orjson into a JSON response."""
+    return app.response_class(orjson.dumps(payload), mimetype="application/json")
 
 # -------------------------------
 # ENDPOINT 1: CREATE SPARK JOB
@@ -45,7 +75,7 @@ def create_job():
         data = request.get_json()
         
         if not data or 'main_python_file' not in data:
-            return jsonify({
+            return orjsonify({
                 "error": "Missing required field: main_python_file"
             }), 400
         
@@ -71,7 +101,7 @@ def create_job():
         
         job_id = result.reference.job_id
         
-        return jsonify({
+        return orjsonify({
             "status": "success",
             "message": "Job submitted successfully",
             "job_id": job_id,
@@ -80,7 +110,7 @@ def create_job():
         }), 201
         
     except Exception as e:
-        return jsonify({
+        return orjsonify({
             "status": "error",
             "message": str(e)
         }), 500
@@ -89,6 +119,41 @@ def create_job():
 # ENDPOINT 2: GET JOB STATUS
 # -------------------------------
 
+def _job_status_response(job):
+    """Build the status payload returned for a Dataproc job."""
+    response = {
+        "job_id": job.reference.job_id,
+        "status": job.status.state.name,
+        "cluster": job.placement.cluster_name,
+        "details": job.status.details if job.status.details else None,
+        "state_start_time": str(job.status.state_start_time) if job.status.state_start_time else None
+    }
+    
+    # Add PySpark job details
+    if job.pyspark_job:
+        response["main_python_file"] = job.pyspark_job.main_python_file_uri
+        if job.pyspark_job.args:
+            response["args"] = list(job.pyspark_job.args)
+    
+    # Add driver output URI if available
+    if job.driver_output_resource_uri:
+        response["driver_output_uri"] = job.driver_output_resource_uri
+    
+    # Check if job is completed
+    if job.status.state == dataproc.JobStatus.State.DONE:
+        response["completed"] = True
+    elif job.status.state == dataproc.JobStatus.State.ERROR:
+        response["completed"] = True
+        response["failed"] = True
+    elif job.status.state == dataproc.JobStatus.State.CANCELLED:
+        response["completed"] = True
+        response["cancelled"] = True
+    else:
+        response["completed"] = False
+    
+    return response
+
+
 @app.route('/spark/job/status', methods=['GET'])
 def get_job_status():
     """
@@ -101,7 +166,7 @@ def get_job_status():
         job_id = request.args.get('job_id')
         
         if not job_id:
-            return jsonify({
+            return orjsonify({
                 "error": "Missing required parameter: job_id"
             }), 400
         
@@ -112,46 +177,115 @@ def get_job_status():
             job_id=job_id
         )
         
-        # Prepare response
-        response = {
-            "job_id": job.reference.job_id,
-            "status": job.status.state.name,
-            "cluster": job.placement.cluster_name,
-            "details": job.status.details if job.status.details else None,
-            "state_start_time": str(job.status.state_start_time) if job.status.state_start_time else None
-        }
-        
-        # Add PySpark job details
-        if job.pyspark_job:
-            response["main_python_file"] = job.pyspark_job.main_python_file_uri
-            if job.pyspark_job.args:
-                response["args"] = list(job.pyspark_job.args)
-        
-        # Add driver output URI if available
-        if job.driver_output_resource_uri:
-            response["driver_output_uri"] = job.driver_output_resource_uri
-        
-        # Check if job is completed
-        if job.status.state == dataproc.JobStatus.State.DONE:
-            response["completed"] = True
-        elif job.status.state == dataproc.JobStatus.State.ERROR:
-            response["completed"] = True
-            response["failed"] = True
-        else:
-            response["completed"] = False
-        
-        return jsonify(response), 200
+        return orjsonify(_job_status_response(job)), 200
         
     except Exception as e:
-        return jsonify({
+        return orjsonify({
             "status": "error",
             "message": str(e)
         }), 500
 
+
+STREAM_HEARTBEAT_SECONDS = 15
+
+TERMINAL_JOB_STATES = (
+    dataproc.JobStatus.State.DONE,
+    dataproc.JobStatus.State.ERROR,
+    dataproc.JobStatus.State.CANCELLED,
+)
+
+
+@app.route('/spark/job/status/stream', methods=['GET'])
+def stream_job_status():
+    """
+    Stream the status of a Spark job as server-sent events.
+    
+    An event is sent for the initial state and then only when the state
+    changes; the stream ends once the job reaches DONE, ERROR or CANCELLED.
+    While the state is unchanged a ": keepalive" comment is sent about every
+    STREAM_HEARTBEAT_SECONDS so proxies keep the connection open and a
+    disconnected client is noticed.
+    
+    Query parameters:
+    - job_id: The ID of the job to watch (required)
+    - interval: Seconds between Dataproc polls (optional, default 2, clamped to 1-60)
+    """
+    job_id = request.args.get('job_id')
+    
+    if not job_id:
+        return orjsonify({
+            "error": "Missing required parameter: job_id"
+        }), 400
+    
+    # Keep polling between 1s and 60s so bad input can't hammer Dataproc
+    # or make time.sleep() fail mid-stream
+    interval = max(1.0, min(request.args.get('interval', 2.0, type=float), 60.0))
+    
+    polls_per_heartbeat = max(1, int(STREAM_HEARTBEAT_SECONDS // interval))
+    
+    def events():
+        last_state = None
+        idle_polls = 0
+        while True:
+            try:
+                job = job_client.get_job(
+                    project_id=PROJECT_ID,
+                    region=REGION,
+                    job_id=job_id
+                )
+            except Exception as e:
+                error = {"status": "error", "message": str(e)}
+                yield f"event: error\ndata: {orjson.dumps(error).decode()}\n\n"
+                return
+            
+            if job.status.state != last_state:
+                last_state = job.status.state
+                idle_polls = 0
+                yield f"data: {orjson.dumps(_job_status_response(job)).decode()}\n\n"
+            else:
+                idle_polls += 1
+                # Writing to a closed connection ends the generator, which
+                # stops polling for clients that went away
+                if idle_polls % polls_per_heartbeat == 0:
+                    yield ": keepalive\n\n"
+            
+            if job.status.state in TERMINAL_JOB_STATES:
+                return
+            
+            time.sleep(interval)
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # -------------------------------
 # ENDPOINT 3: GET JSON FILES FROM BUCKET
 # -------------------------------
 
+def _fetch(bucket, key, path):
+    """
+    Read and parse one JSON file from the bucket.
+    
+    Returns (key, payload, client_error) where payload is the parsed JSON or
+    an error description, and client_error is True when the file is missing.
+    """
+    try:
+        content = bucket.blob(path).download_as_bytes()
+        return key, orjson.loads(content), False
+    except NotFound:
+        return key, {
+            "error": "File not found",
+            "path": f"gs://{bucket.name}/{path}"
+        }, True
+    except Exception as e:
+        return key, {
+            "error": str(e),
+            "path": f"gs://{bucket.name}/{path}"
+        }, False
+
+
 @app.route('/results', methods=['GET'])
 def get_results():
     """
@@ -169,58 +303,32 @@ def get_results():
         if path_prefix and not path_prefix.endswith('/'):
             path_prefix += '/'
         
-        problem_1_path = f"{path_prefix}problem1/part-00000"
-        problem_2_path = f"{path_prefix}problem2/part-00000"
+        problem_1_path = f"{path_prefix}problem_1.json"
+        problem_2_path = f"{path_prefix}problem_2.json"
+        
+        bucket = DEFAULT_BUCKET if bucket_name == BUCKET_NAME else storage_client.bucket(bucket_name)
         
-        bucket = storage_client.bucket(bucket_name)
+        # Fetch both files concurrently so the GCS round-trips overlap
+        futures = [
+            results_executor.submit(_fetch, bucket, "problem_1", problem_1_path),
+            results_executor.submit(_fetch, bucket, "problem_2", problem_2_path),
+        ]
+        fetched = [f.result() for f in futures]
         
         results = {}
         client_error = False
-        # Read problem_1.json
-        try:
-            blob_1 = bucket.blob(problem_1_path)
-            if blob_1.exists():
-                content_1 = blob_1.download_as_text()
-                results["problem_1"] = json.loads(content_1)
-            else:
-                results["problem_1"] = {
-                    "error": "File not found",
-                    "path": f"gs://{bucket_name}/{problem_1_path}"
-                }
-                client_error = True
-        except Exception as e:
-            results["problem_1"] = {
-                "error": str(e),
-                "path": f"gs://{bucket_name}/{problem_1_path}"
-            }
-        
-        # Read problem_2.json
-        try:
-            blob_2 = bucket.blob(problem_2_path)
-            if blob_2.exists():
-                content_2 = blob_2.download_as_text()
-                results["problem_2"] = json.loads(content_2)
-            else:
-                results["problem_2"] = {
-                    "error": "File not found",
-                    "path": f"gs://{bucket_name}/{problem_2_path}"
-                }
-                client_error = True
-        except Exception as e:
-            results["problem_2"] = {
-                "error": str(e),
-                "path": f"gs://{bucket_name}/{problem_2_path}"
-            }
-            
+        for key, payload, not_found in fetched:
+            results[key] = payload
+            client_error = client_error or not_found
         
-        return jsonify({
+        return orjsonify({
             "status": "success" if not client_error else "client_error",
             "bucket": bucket_name,
             "results": results
         }), 200 if not client_error else 400
         
     except Exception as e:
-        return jsonify({
+        return orjsonify({
             "status": "error",
             "message": str(e)
         }), 500
@@ -233,7 +341,7 @@ def get_results():
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return orjsonify({
         "status": "healthy",
         "service": "Dataproc Flask API",
         "project_id": PROJECT_ID,
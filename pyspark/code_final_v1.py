@@ -1,135 +1,162 @@
 import json
-from pyspark import RDD
 from pyspark.sql import DataFrame, SparkSession
+from pyspark.sql.types import BooleanType, DateType, DoubleType, StringType, StructField, StructType
 import os
+import sys
 
 
+# flights_data.txt has no header: FlightDate,Airline,Origin
+FLIGHTS_TEXT_SCHEMA = StructType(
+    [
+        StructField("FlightDate", StringType()),
+        StructField("Airline", StringType()),
+        StructField("Origin", StringType()),
+    ]
+)
+
+# Columns of flights_data.csv used by Problem 2. The file has far more
+# columns than this, so the types are applied by casting after the select
+# rather than by handing the reader a positional schema.
+FLIGHTS_CSV_SCHEMA = StructType(
+    [
+        StructField("FlightDate", DateType()),
+        StructField("Airline", StringType()),
+        StructField("Cancelled", BooleanType()),
+        StructField("Diverted", BooleanType()),
+        StructField("OriginCityName", StringType()),
+        StructField("DestCityName", StringType()),
+        StructField("AirTime", DoubleType()),
+        StructField("DepTime", DoubleType()),
+    ]
+)
+
 
 ####################################################################
-# DELETE GCS PATH
+# CHECK GCS PATH
 ####################################################################
-def delete_gcs_path(spark, gcs_path):
-    try:
-        uri = spark._jvm.java.net.URI(gcs_path)
-        hadoop_conf = spark._jsc.hadoopConfiguration()
-        fs = spark._jvm.org.apache.hadoop.fs.FileSystem.get(uri, hadoop_conf)
-        path = spark._jvm.org.apache.hadoop.fs.Path(uri.getPath())
-
-        if fs.exists(path):
-            fs.delete(path, True)
-            print(f" Deleted: {gcs_path}")
-        else:
-            print(f" Not found (OK): {gcs_path}")
-
-    except Exception as e:
-        print(f" Error deleting {gcs_path}: {e}")
+def gcs_path_exists(spark, gcs_path):
+    uri = spark._jvm.java.net.URI(gcs_path)
+    hadoop_conf = spark._jsc.hadoopConfiguration()
+    fs = spark._jvm.org.apache.hadoop.fs.FileSystem.get(uri, hadoop_conf)
+    return fs.exists(spark._jvm.org.apache.hadoop.fs.Path(uri.getPath()))
 
 
 ####################################################################
 # SAVE RESULTS AS JSON TO GCS
 ####################################################################
-def save_json_to_gcs(spark, obj, gcs_path):
-    delete_gcs_path(spark, gcs_path)
+def save_json_to_gcs(obj, gcs_path):
+    from google.cloud import storage
+
+    bucket_name, blob_name = gcs_path[len("gs://"):].split("/", 1)
 
-    json_str = json.dumps(json.loads(json.dumps(obj, default=str)), indent=2)
+    json_str = json.dumps(obj, indent=2, default=str)
 
-    spark.sparkContext.parallelize([json_str], 1).saveAsTextFile(gcs_path)
+    storage.Client().bucket(bucket_name).blob(blob_name).upload_from_string(
+        json_str, content_type="application/json"
+    )
 
     print(f" JSON saved to: {gcs_path}")
 
 
 ####################################################################
-# PROBLEM 1
+# LOAD FLIGHTS CSV
 ####################################################################
-def co_occurring_airline_pairs_by_origin(flights_data: RDD) -> RDD:
-    parsed_data = flights_data.map(lambda line: line.split(','))
-    date_origin_airline = parsed_data.map(lambda x: ((x[0], x[2]), x[1]))
-    grouped_airlines = date_origin_airline.groupByKey().mapValues(list)
-
-    def generate_pairs(airlines):
-        u = sorted(set(airlines))
-        return [((u[i], u[j]), 1) for i in range(len(u)) for j in range(i + 1, len(u))]
+def load_flights_csv(spark, csv_path) -> DataFrame:
+    from pyspark.sql.functions import col
 
     return (
-        grouped_airlines.flatMap(lambda x: generate_pairs(x[1]))
-        .reduceByKey(lambda a, b: a + b)
-        .sortBy(lambda x: (-x[1], x[0][0], x[0][1]))  # descending by count
+        spark.read.option("header", True)
+        .csv(csv_path)
+        .select([col(f.name).cast(f.dataType).alias(f.name) for f in FLIGHTS_CSV_SCHEMA.fields])
     )
 
 
 ####################################################################
-# PROBLEM 2
+# CONVERT FLIGHTS CSV TO PARQUET (ONE-TIME)
 ####################################################################
-def air_flights_most_canceled_flights(flights: DataFrame) -> str:
-    from pyspark.sql.functions import col, count, year, month
-
-    df = (
-        flights.filter(
-            (year(col("FlightDate")) == 2021)
-            & (month(col("FlightDate")) == 1)
-            & (col("Cancelled") == True)
-        )
-        .groupBy("Airline")
-        .agg(count("*").alias("cancelled_count"))
-        .orderBy(col("cancelled_count").desc())
-        .first()
-    )
-    return df["Airline"] if df else ""
-
+def convert_flights_to_parquet(spark, csv_path, parquet_path):
+    # Not partitioned: no query filters on date, and partitionBy would
+    # write one small file per input task into every month it touches
+    load_flights_csv(spark, csv_path).write.mode("overwrite").parquet(parquet_path)
+    print(f" Parquet written to: {parquet_path}")
 
-def air_flights_diverted_flights(flights: DataFrame) -> int:
-    from pyspark.sql.functions import col, year, month, dayofmonth
 
-    return flights.filter(
-        (year(col("FlightDate")) == 2021)
-        & (month(col("FlightDate")) == 11)
-        & (dayofmonth(col("FlightDate")) >= 1)
-        & (dayofmonth(col("FlightDate")) <= 30)
-        & (col("Diverted") == True)
-    ).count()
+####################################################################
+# PROBLEM 1
+####################################################################
+def co_occurring_airline_pairs_by_origin(flights_data: DataFrame) -> DataFrame:
+    from pyspark.sql.functions import col, desc
 
+    date_origin_airline = flights_data.select("FlightDate", "Origin", "Airline").dropDuplicates()
 
-def air_flights_avg_airtime(flights: DataFrame) -> float:
-    from pyspark.sql.functions import col, avg
+    a = date_origin_airline.alias("a")
+    b = date_origin_airline.alias("b")
 
-    df = (
-        flights.filter(
-            (col("OriginCityName") == "Los Angeles, CA")
-            & (col("DestCityName") == "New York, NY")
-            & col("AirTime").isNotNull()
+    return (
+        a.join(
+            b,
+            (col("a.FlightDate") == col("b.FlightDate"))
+            & (col("a.Origin") == col("b.Origin"))
+            & (col("a.Airline") < col("b.Airline")),
         )
-        .agg(avg("AirTime").alias("avg_airtime"))
-        .first()
+        .groupBy(col("a.Airline").alias("flight_1"), col("b.Airline").alias("flight_2"))
+        .count()
+        .orderBy(desc("count"), "flight_1", "flight_2")  # descending by count
+        .limit(10)
     )
-    return float(df["avg_airtime"]) if df["avg_airtime"] else 0.0
-
 
-def air_flights_missing_departure_time(flights: DataFrame) -> int:
-    from pyspark.sql.functions import col, countDistinct
 
-    df = (
-        flights.filter(col("DepTime").isNull())
-        .agg(countDistinct("FlightDate").alias("unique"))
-        .first()
+####################################################################
+# PROBLEM 2
+####################################################################
+def air_flights_summary(flights: DataFrame) -> dict:
+    # All five questions as conditional aggregates of one groupBy("Airline")
+    # scan; the per-airline rows are reduced on the driver.
+    from pyspark.sql.functions import col, collect_set, count, lit, when
+    from pyspark.sql.functions import sum as spark_sum
+
+    # Only used inside when(): the scan is unfiltered, so these avoid per-row
+    # date-part extraction but aren't pushed down to Parquet
+    january_2021 = col("FlightDate").between(lit("2021-01-01"), lit("2021-01-31"))
+    november_2021 = col("FlightDate").between(lit("2021-11-01"), lit("2021-11-30"))
+    la_to_ny = (
+        (col("OriginCityName") == "Los Angeles, CA")
+        & (col("DestCityName") == "New York, NY")
+        & col("AirTime").isNotNull()
     )
-    return int(df["unique"]) if df["unique"] else 0
 
-
-def air_flights_most_canceled_flights_november(flights: DataFrame) -> str:
-    from pyspark.sql.functions import col, count, year, month
-
-    df = (
-        flights.filter(
-            (year(col("FlightDate")) == 2021)
-            & (month(col("FlightDate")) == 11)
-            & (col("Cancelled") == True)
+    rows = (
+        flights.groupBy("Airline")
+        .agg(
+            spark_sum(when(january_2021 & (col("Cancelled") == True), 1).otherwise(0)).alias("cancelled_jan"),
+            spark_sum(when(november_2021 & (col("Cancelled") == True), 1).otherwise(0)).alias("cancelled_nov"),
+            spark_sum(when(november_2021 & (col("Diverted") == True), 1).otherwise(0)).alias("diverted_nov"),
+            spark_sum(when(la_to_ny, col("AirTime"))).alias("la_ny_airtime_sum"),
+            count(when(la_to_ny, col("AirTime"))).alias("la_ny_airtime_count"),
+            collect_set(when(col("DepTime").isNull(), col("FlightDate"))).alias("missing_dep_dates"),
         )
-        .groupBy("Airline")
-        .agg(count("*").alias("cancelled_count"))
-        .orderBy(col("cancelled_count").desc())
-        .first()
+        .collect()
     )
-    return df["Airline"] if df else ""
+
+    def most_canceled(key):
+        top = max(rows, key=lambda r: r[key], default=None)
+        return top["Airline"] if top and top[key] else ""
+
+    airtime_sum = 0.0
+    airtime_count = 0
+    missing_dep_dates = set()
+    for r in rows:
+        airtime_sum += r["la_ny_airtime_sum"] or 0.0
+        airtime_count += r["la_ny_airtime_count"]
+        missing_dep_dates.update(r["missing_dep_dates"])
+
+    return {
+        "most_canceled_january": most_canceled("cancelled_jan"),
+        "diverted_november": int(sum(r["diverted_nov"] for r in rows)),
+        "avg_airtime": float(airtime_sum / airtime_count) if airtime_count else 0.0,
+        "missing_departure_dates": len(missing_dep_dates),
+        "most_canceled_november": most_canceled("cancelled_nov"),
+    }
 
 
 ####################################################################
@@ -137,7 +164,6 @@ def air_flights_most_canceled_flights_november(flights: DataFrame) -> str:
 ####################################################################
 def main():
     spark = SparkSession.builder.appName("Airlines-Analysis").getOrCreate()
-    sc = spark.sparkContext
 
     # Load environment variables
     GCS_BUCKET = os.getenv("BUCKET_NAME")
@@ -149,34 +175,40 @@ def main():
 
     airline_textfile = gcs(GCS_BASE_PATH, "flights_data.txt")
     airline_csvfile = gcs(GCS_BASE_PATH, "flights_data.csv")
+    airline_parquet = gcs(GCS_BASE_PATH, "flights.parquet")
 
     print("=================== PROBLEM 1 ===================")
-    flights_data = sc.textFile(airline_textfile)
-    result_problem1 = co_occurring_airline_pairs_by_origin(flights_data).collect()
-
-    # ========= TAKE ONLY TOP 10 =========
-    top10 = result_problem1[:10]
+    flights_data = spark.read.csv(airline_textfile, schema=FLIGHTS_TEXT_SCHEMA)
+    top10 = co_occurring_airline_pairs_by_origin(flights_data).collect()
 
     # ========= FORMAT JSON EXACTLY AS REQUIRED =========
     formatted_p1 = {
         str(i + 1): {
-            "flight_1": top10[i][0][0],
-            "flight_2": top10[i][0][1],
-            "common_origin": top10[i][1],
+            "flight_1": row["flight_1"],
+            "flight_2": row["flight_2"],
+            "common_origin": row["count"],
         }
-        for i in range(10)
+        for i, row in enumerate(top10)
     }
 
-    save_json_to_gcs(spark, formatted_p1, gcs(GCS_BASE_PATH, "problem1"))
+    save_json_to_gcs(formatted_p1, gcs(GCS_BASE_PATH, "problem_1.json"))
 
     print("=================== PROBLEM 2 ===================")
-    flights = spark.read.csv(airline_csvfile, header=True, inferSchema=True)
+    # The Parquet copy is built on first run and then reused; pass
+    # --rebuild-parquet whenever flights_data.csv changes. _SUCCESS is only
+    # written once a conversion has fully completed.
+    if "--rebuild-parquet" in sys.argv[1:] or not gcs_path_exists(spark, f"{airline_parquet}/_SUCCESS"):
+        convert_flights_to_parquet(spark, airline_csvfile, airline_parquet)
+
+    flights = spark.read.parquet(airline_parquet)
+
+    summary = air_flights_summary(flights)
 
-    q1 = f"{air_flights_most_canceled_flights(flights)} had the most canceled flights in January 2021."
-    q2 = f"{air_flights_diverted_flights(flights)} flights were diverted between the period of 1st-30th November 2021."
-    q3 = f"{air_flights_avg_airtime(flights)} is the average airtime for flights that were flying from Los Angeles to New York."
-    q4 = f"{air_flights_missing_departure_time(flights)} unique dates where departure time (DepTime) was not recorded."
-    q5 = f"{air_flights_most_canceled_flights_november(flights)} had the most canceled flights in November 2021."
+    q1 = f"{summary['most_canceled_january']} had the most canceled flights in January 2021."
+    q2 = f"{summary['diverted_november']} flights were diverted between the period of 1st-30th November 2021."
+    q3 = f"{summary['avg_airtime']} is the average airtime for flights that were flying from Los Angeles to New York."
+    q4 = f"{summary['missing_departure_dates']} unique dates where departure time (DepTime) was not recorded."
+    q5 = f"{summary['most_canceled_november']} had the most canceled flights in November 2021."
 
     result_problem2 = [
         {"q1": q1},
@@ -186,7 +218,7 @@ def main():
         {"q5": q5},
     ]
 
-    save_json_to_gcs(spark, result_problem2, gcs(GCS_BASE_PATH, "problem2"))
+    save_json_to_gcs(result_problem2, gcs(GCS_BASE_PATH, "problem_2.json"))
 
     spark.stop()
 